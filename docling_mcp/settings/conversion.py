@@ -1,5 +1,7 @@
 """This module contains the settings for conversion tools."""
 
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,6 +19,14 @@ class Settings(BaseSettings):
     num_threads: int = 30  # Number of CPU threads for parallel processing
     ocr_confidence_threshold: float = 0.5  # OCR confidence threshold (0.0-1.0)
     default_output_directory: str = "C:\\Users\\Iljaas\\Downloads\\"
+    # Docling batch concurrency, docling's own defaults are used when unset
+    doc_batch_size: Optional[int] = None  # Documents grouped into one conversion batch
+    doc_batch_concurrency: Optional[int] = None  # Documents converted concurrently
+    page_batch_size: Optional[int] = None  # Pages grouped into one pipeline batch
+    page_batch_concurrency: Optional[int] = None  # Page batches processed concurrently
+    gc_threshold_mb: int = 512  # RSS growth (MB) that triggers a full garbage collection
+    max_workers: Optional[int] = None  # Conversion worker processes, defaults to the CPU count
+    max_tasks_per_worker: Optional[int] = None  # Recycle conversion workers after N tasks (Python 3.11+)
 
 
 settings = Settings()
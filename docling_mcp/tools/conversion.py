@@ -1,23 +1,33 @@
 """Tools for converting documents into DoclingDocument objects."""
 
+import asyncio
 import gc
+import multiprocessing
+import os
+import sys
+from collections.abc import Iterable, Iterator, Sized
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import Annotated, Any, Optional
 
 from mcp.server.fastmcp import Context
 from mcp.shared.exceptions import McpError
 from mcp.types import INTERNAL_ERROR, ErrorData, ToolAnnotations
 from pydantic import Field
 
-from docling.datamodel.base_models import InputFormat
+from docling.datamodel.base_models import ConversionStatus, InputFormat
+from docling.datamodel.document import ConversionResult
 from docling.datamodel.pipeline_options import (
     PdfPipelineOptions,
 )
+from docling.datamodel.settings import settings as docling_settings
 from docling.document_converter import DocumentConverter, FormatOption, PdfFormatOption
 from docling_core.types.doc.document import (
     ContentLayer,
+    DoclingDocument,
 )
 from docling_core.types.doc.labels import (
     DocItemLabel,
@@ -28,17 +38,62 @@ from docling_mcp.logger import setup_logger
 from docling_mcp.settings.conversion import settings
 from docling_mcp.shared import local_document_cache, local_stack_cache, mcp
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
 # Create a default project logger
 logger = setup_logger()
 
+# Conversion statuses whose document can be used
+_SUCCESS_STATUSES = frozenset(
+    {ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS}
+)
+
+# RSS (in MB) observed at the last full garbage collection
+_last_full_gc_rss_mb = 0.0
+
+
+def _get_rss_mb() -> Optional[float]:
+    """Return the resident set size of the process in MB, if available.
+
+    The current RSS is read with psutil when it is installed, which also works on
+    Windows. Otherwise the peak RSS is read with the resource module.
+    """
+    if psutil is not None:
+        return float(psutil.Process().memory_info().rss) / (1024 * 1024)
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
 
 def cleanup_memory() -> None:
-    """Force garbage collection to free up memory."""
-    logger.info("Performed memory cleanup")
-    gc.collect()
+    """Collect garbage, running a full collection only under memory pressure.
 
+    A full collection is O(live objects) and stalls the event loop, so it only runs
+    once the RSS has grown by more than ``gc_threshold_mb`` since the last one.
+    Otherwise only the youngest generation is collected. Without a way to read the
+    RSS, every call runs a full collection.
+    """
+    global _last_full_gc_rss_mb
+    rss_mb = _get_rss_mb()
+    if rss_mb is None or rss_mb - _last_full_gc_rss_mb > settings.gc_threshold_mb:
+        gc.collect()
+        _last_full_gc_rss_mb = rss_mb or 0.0
+        logger.info("Performed memory cleanup")
+    else:
+        gc.collect(generation=0)
 
-@dataclass
+
+@dataclass(slots=True)
 class IsDoclingDocumentInCacheOutput:
     """Output of the is_document_in_local_cache tool."""
 
@@ -66,7 +121,7 @@ def is_document_in_local_cache(
     return IsDoclingDocumentInCacheOutput(document_key in local_document_cache)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConvertDocumentOutput:
     """Output of the convert_document_into_docling_document tool."""
 
@@ -84,14 +139,17 @@ class ConvertDocumentOutput:
     ]
 
 
-@lru_cache
-def _get_converter() -> DocumentConverter:
+# Only the latest converter is kept, workers rebuild it for a new thread count
+@lru_cache(maxsize=1)
+def _get_converter(num_threads: Optional[int] = None) -> DocumentConverter:
     pipeline_options = PdfPipelineOptions()
     pipeline_options.do_ocr = settings.do_ocr
     pipeline_options.generate_page_images = settings.keep_images
     
-    # Configure threading
-    if hasattr(settings, 'num_threads'):
+    # Configure threading, num_threads overrides the configured thread count
+    if num_threads is not None:
+        pipeline_options.accelerator_options.num_threads = num_threads
+    elif hasattr(settings, 'num_threads'):
         pipeline_options.accelerator_options.num_threads = settings.num_threads
     
     # Configure OCR options
@@ -101,15 +159,50 @@ def _get_converter() -> DocumentConverter:
     if hasattr(settings, 'ocr_confidence_threshold'):
         pipeline_options.ocr_options.confidence_threshold = settings.ocr_confidence_threshold
 
+    # Configure batch concurrency used by convert_all
+    for name in (
+        "doc_batch_size",
+        "doc_batch_concurrency",
+        "page_batch_size",
+        "page_batch_concurrency",
+    ):
+        value = getattr(settings, name)
+        if value is not None:
+            setattr(docling_settings.perf, name, value)
+
+    pdf_format_option = PdfFormatOption(pipeline_options=pipeline_options)
     format_options: dict[InputFormat, FormatOption] = {
-        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
-        InputFormat.IMAGE: PdfFormatOption(pipeline_options=pipeline_options),
+        InputFormat.PDF: pdf_format_option,
+        InputFormat.IMAGE: pdf_format_option,
     }
 
     logger.info(f"Creating DocumentConverter with format_options: {format_options}")
     return DocumentConverter(format_options=format_options)
 
 
+def _warn_conversion_errors(result: ConversionResult, source: str) -> None:
+    """Log the errors of a document that was only partially converted."""
+    if result.errors:
+        logger.warning(f"Partially converted {source}: {result.errors}")
+
+
+def _cache_document(cache_key: str, document: DoclingDocument, source: str) -> None:
+    """Store a converted document in the local cache and start its item stack.
+
+    The source is recorded in the document as a furniture text item, which is the
+    initial item of the stack used by the generation tools.
+    """
+    local_document_cache[cache_key] = document
+
+    item = document.add_text(
+        label=DocItemLabel.TEXT,
+        text=f"source: {source}",
+        content_layer=ContentLayer.FURNITURE,
+    )
+
+    local_stack_cache[cache_key] = [item]
+
+
 # @mcp.tool(
 #     title="Convert document into Docling document",
 #     annotations=ToolAnnotations(readOnlyHint=False, destructiveHint=False),
@@ -149,34 +242,13 @@ def convert_document_into_docling_document(
         logger.info("Start conversion")
         result = converter.convert(source)
 
-        # Check for errors - handle different API versions
-        has_error = False
-        error_message = ""
-
-        # Try different ways to check for errors based on the API version
-        if hasattr(result, "status"):
-            if hasattr(result.status, "is_error"):
-                has_error = result.status.is_error
-            elif hasattr(result.status, "error"):
-                has_error = result.status.error
-
-        if hasattr(result, "errors") and result.errors:
-            has_error = True
-            error_message = str(result.errors)
-
-        if has_error:
-            error_msg = f"Conversion failed: {error_message}"
+        # Check for errors
+        if result.status not in _SUCCESS_STATUSES:
+            error_msg = f"Conversion failed: {result.status}: {result.errors}"
             raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_msg))
+        _warn_conversion_errors(result, source)
 
-        local_document_cache[cache_key] = result.document
-
-        item = result.document.add_text(
-            label=DocItemLabel.TEXT,
-            text=f"source: {source}",
-            content_layer=ContentLayer.FURNITURE,
-        )
-
-        local_stack_cache[cache_key] = [item]
+        _cache_document(cache_key, result.document, source)
 
         # Log completion
         logger.info(f"Successfully created the Docling document: {source}")
@@ -203,6 +275,110 @@ class ConvertToMarkdownOutput:
     ]
 
 
+def _get_max_workers() -> int:
+    """Return the number of worker processes of the conversion pool."""
+    return settings.max_workers or os.cpu_count() or 1
+
+
+def _get_worker_num_threads(num_sources: Optional[int] = None) -> int:
+    """Return the number of threads each worker converts a batch of sources with.
+
+    The cores are split across the workers the batch keeps busy, so a single source
+    gets every core, up to the configured ``num_threads``. A batch of unknown size
+    is assumed to fill the pool.
+    """
+    max_workers = _get_max_workers()
+    workers = min(num_sources, max_workers) if num_sources else max_workers
+    return max(1, min(settings.num_threads, (os.cpu_count() or 1) // workers))
+
+
+def _worker_init() -> None:
+    """Prepare a conversion worker process.
+
+    The converter is built once here for the thread count of a full pool, and
+    reused for every task the worker serves with that count. Docling applies the
+    count to torch when it loads the models, which it does on the first conversion
+    of each format, so a worker that only converts HTML never loads the PDF models.
+    """
+    num_threads = _get_worker_num_threads()
+    # Docling loads tesseract lazily, which reads the OpenMP limit once on load
+    os.environ["OMP_THREAD_LIMIT"] = str(num_threads)
+    _get_converter(num_threads)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Size of the slices in which Markdown output is encoded and written to disk
+_WRITE_CHUNK_SIZE = 1 << 20
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool used for Markdown conversions.
+
+    Worker processes are only spawned on demand, so a batch of ``n`` sources never
+    starts more than ``min(n, max_workers)`` workers. ``max_workers`` defaults to
+    the CPU count.
+    """
+    global _process_pool
+    if _process_pool is None:
+        kwargs: dict[str, Any] = {}
+        if settings.max_tasks_per_worker and sys.version_info >= (3, 11):
+            # Recycling workers releases their memory without a full collection
+            kwargs["max_tasks_per_child"] = settings.max_tasks_per_worker
+        _process_pool = ProcessPoolExecutor(
+            max_workers=_get_max_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            **kwargs,
+        )
+    return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Shut down a broken process pool so the next call builds a new one."""
+    global _process_pool
+    pool.shutdown(wait=False, cancel_futures=True)
+    if _process_pool is pool:
+        _process_pool = None
+
+
+def _get_output_file(source: str, output_folder: Optional[str]) -> Path:
+    """Return the path of the Markdown file a source is saved to."""
+    source_path = Path(source)
+    file_name = f"{source_path.stem}.md"
+    if output_folder:
+        return Path(output_folder) / file_name
+
+    # Determine output path based on source type
+    if source_path.is_absolute() and source_path.exists(): # Check if it's a local file path
+        return source_path.parent / file_name
+    # Assume it's a URL or invalid local path, use default
+    return Path(settings.default_output_directory) / file_name
+
+
+def _convert_one(source: str, output_file: Path, num_threads: int) -> str:
+    """Convert a single source to Markdown and return the path of the written file.
+
+    This runs inside a worker process of the conversion pool, where the converter
+    was already loaded by ``_worker_init``. The output directory must exist. Errors
+    are raised as plain exceptions since ``McpError`` does not survive pickling.
+    """
+    result = _get_converter(num_threads).convert(source)
+    if result.status not in _SUCCESS_STATUSES:
+        raise RuntimeError(f"Conversion failed for {source}: {result.errors}")
+    _warn_conversion_errors(result, source)
+
+    markdown_content = result.document.export_to_markdown()
+    # Release the Docling document before writing, only the Markdown is needed now
+    del result
+
+    # Write in slices so the encoded copy never exceeds one chunk
+    with output_file.open("w", encoding="utf-8", buffering=_WRITE_CHUNK_SIZE) as f:
+        for start in range(0, len(markdown_content), _WRITE_CHUNK_SIZE):
+            f.write(markdown_content[start : start + _WRITE_CHUNK_SIZE])
+    return str(output_file)
+
+
 @mcp.tool(title="Convert one or more documents to Markdown")
 async def convert_to_markdown(
     sources: Annotated[
@@ -230,46 +406,101 @@ async def convert_to_markdown(
     converts each document to a Docling document, exports it to Markdown,
     and saves it to the specified output folder.
     """
-    output_files = []
-    converter = _get_converter()
-    total_sources = len(sources)
+    return await _convert_sources_to_markdown(sources, ctx, output_folder)
 
-    for i, source in enumerate(sources):
-        try:
-            source = source.strip("\"'")
-            logger.info(f"Processing document from source: {source}")
-            await ctx.info(f"Processing source: {source}")
-            await ctx.report_progress(i + 1, total_sources)
 
-            current_output_path: Path
-            if output_folder:
-                current_output_path = Path(output_folder)
-            else:
-                # Determine output path based on source type
-                if Path(source).is_absolute() and Path(source).exists(): # Check if it's a local file path
-                    current_output_path = Path(source).parent
-                else: # Assume it's a URL or invalid local path, use default
-                    current_output_path = Path(settings.default_output_directory)
+def _conversion_error(source: str, error: Exception) -> McpError:
+    """Log a failed conversion and wrap the error for the MCP client."""
+    logger.exception(f"Error converting document: {source}")
+    return McpError(
+        ErrorData(code=INTERNAL_ERROR, message=f"Unexpected error for {source}: {error!s}")
+    )
 
-            current_output_path.mkdir(parents=True, exist_ok=True)
 
-            result = converter.convert(source)
-            if hasattr(result, "status") and hasattr(result.status, "is_error") and result.status.is_error:
-                error_msg = f"Conversion failed for {source}"
-                raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_msg))
+async def _convert_sources_to_markdown(
+    sources: Iterable[str],
+    ctx: Context,  # type: ignore[type-arg]
+    output_folder: Optional[str],
+) -> ConvertToMarkdownOutput:
+    """Convert sources to Markdown in the process pool.
 
-            markdown_content = result.document.export_to_markdown()
-            file_name = Path(source).stem
-            output_file = current_output_path / f"{file_name}.md"
-            output_file.write_text(markdown_content, encoding="utf-8")
-            output_files.append(str(output_file))
-            logger.info(f"Successfully converted {source} to {output_file}")
+    Each source is submitted to the pool as soon as it is produced, so workers can
+    start converting while a lazy iterable of sources is still being consumed. Two
+    sources that would write the same Markdown file are rejected, and sources still
+    pending when a conversion fails are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    # The total of a lazy iterable is only known once all sources are produced
+    total_sources = len(sources) if isinstance(sources, Sized) else None
+    num_threads = _get_worker_num_threads(total_sources)
+    completed = 0
+    progress_tasks: list[asyncio.Task[None]] = []
+    created_paths: set[Path] = set()
+    output_sources: dict[Path, str] = {}
+    submitted: list[tuple[str, asyncio.Future[str]]] = []
+
+    def _on_done(future: asyncio.Future[str]) -> None:
+        nonlocal completed
+        if future.cancelled():
+            return
+        completed += 1
+        progress_tasks.append(
+            loop.create_task(ctx.report_progress(completed, total_sources))
+        )
 
-        except Exception as e:
-            logger.exception(f"Error converting document: {source}")
-            raise McpError(
-                ErrorData(code=INTERNAL_ERROR, message=f"Unexpected error for {source}: {e!s}")
-            ) from e
+    try:
+        for source in sources:
+            source = source.strip("\"'")
+            logger.info(f"Processing document from source: {source}")
+            await ctx.info(f"Processing source: {source}")
+            try:
+                output_file = _get_output_file(source, output_folder)
+                output_path = output_file.parent
+                # Sources usually share their output directory, create it only once
+                if output_path not in created_paths:
+                    output_path.mkdir(parents=True, exist_ok=True)
+                    created_paths.add(output_path)
+            except Exception as e:
+                raise _conversion_error(source, e) from e
+
+            if output_file in output_sources:
+                error_msg = (
+                    f"{source} and {output_sources[output_file]} would both be "
+                    f"converted to {output_file}"
+                )
+                raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_msg))
+            output_sources[output_file] = source
+
+            try:
+                future = loop.run_in_executor(
+                    pool, _convert_one, source, output_file, num_threads
+                )
+            except BrokenProcessPool as e:
+                _discard_process_pool(pool)
+                raise _conversion_error(source, e) from e
+            future.add_done_callback(_on_done)
+            submitted.append((source, future))
+
+        total_sources = len(submitted)
+
+        output_files: list[str] = []
+        for source, future in submitted:
+            try:
+                converted_file = await future
+            except BrokenProcessPool as e:
+                # A worker died, the pool cannot take new tasks anymore
+                _discard_process_pool(pool)
+                raise _conversion_error(source, e) from e
+            except Exception as e:
+                raise _conversion_error(source, e) from e
+            logger.info(f"Successfully converted {source} to {converted_file}")
+            output_files.append(converted_file)
+    finally:
+        # After a failure, drop the sources still queued in the pool
+        for _, future in submitted:
+            future.cancel()
+        await asyncio.gather(*progress_tasks, return_exceptions=True)
 
     cleanup_memory()
     return ConvertToMarkdownOutput(output_files=output_files)
@@ -298,63 +529,55 @@ async def convert_directory_files_into_docling_document(
         # Remove any quotes from the source string
         source = source.strip("\"'")
         directory = Path(source)
-        files: list[Path] = list(directory.iterdir())
-        out: list[ConvertDocumentOutput] = []
-        logger.info("Getting the converter")
-        converter = _get_converter()
-
-        for i, file in enumerate(files):
-            if not file.is_file():
-                continue
-
-            # Track progress
-            await ctx.info(f"Processing file {file}")
-            await ctx.report_progress(i + 1, len(files))
-
-            logger.info(f"Processing file {file}")
-            cache_key = get_cache_key(str(file))
+        # scandir entries carry their file type, so no extra stat per file is needed
+        with os.scandir(directory) as entries:
+            files: list[os.DirEntry[str]] = [e for e in entries if e.is_file()]
+        outputs: dict[str, ConvertDocumentOutput] = {}
+        pending: dict[str, tuple[str, str]] = {}
+
+        for entry in files:
+            cache_key = get_cache_key(entry.path)
             if cache_key in local_document_cache:
-                logger.info(f"{file} has been previously converted.")
-                out.append(ConvertDocumentOutput(True, cache_key))
+                logger.info(f"{entry.path} has been previously converted.")
+                outputs[entry.path] = ConvertDocumentOutput(True, cache_key)
             else:
-                # Convert the document
-                logger.info("Start conversion")
-                result = converter.convert(file)
-                has_error = False
-                error_message = ""
-                if hasattr(result, "status"):
-                    if hasattr(result.status, "is_error"):
-                        has_error = result.status.is_error
-                    elif hasattr(result.status, "error"):
-                        has_error = result.status.error
-
-                if hasattr(result, "errors") and result.errors:
-                    has_error = True
-                    error_message = str(result.errors)
-
-                if has_error:
-                    error_msg = f"Conversion failed: {error_message}"
-                    raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_msg))
+                pending[entry.name] = (entry.path, cache_key)
 
-                local_document_cache[cache_key] = result.document
+        if pending:
+            logger.info("Getting the converter")
+            converter = _get_converter()
 
-                item = result.document.add_text(
-                    label=DocItemLabel.TEXT,
-                    text=f"source: {file}",
-                    content_layer=ContentLayer.FURNITURE,
-                )
+            # Convert all remaining files in one batch so docling can pipeline them
+            logger.info("Start conversion")
+            # Paths (not strings) keep docling reading the files from disk
+            results = converter.convert_all(
+                [Path(file) for file, _ in pending.values()], raises_on_error=False
+            )
+            for i, result in enumerate(results):
+                # File names are unique within the directory
+                file, cache_key = pending[result.input.file.name]
+
+                # Track progress
+                await ctx.info(f"Converted file {file}")
+                await ctx.report_progress(i + 1, len(pending))
 
-                local_stack_cache[cache_key] = [item]
+                # convert_all does not raise, failed files are reported by status
+                if result.status not in _SUCCESS_STATUSES:
+                    error_msg = f"Conversion failed for {file}: {result.errors}"
+                    raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_msg))
+                _warn_conversion_errors(result, file)
+
+                _cache_document(cache_key, result.document, file)
 
                 await ctx.debug(
                     f"Completed step {i + 1} with Docling document key: {cache_key}"
                 )
                 logger.info(f"Successfully created the Docling document: {file}")
-                out.append(ConvertDocumentOutput(False, cache_key))
+                outputs[file] = ConvertDocumentOutput(False, cache_key)
 
         cleanup_memory()
 
-        return out
+        return [outputs[entry.path] for entry in files]
 
     except Exception as e:
         logger.exception(f"Error converting files in directory: {source}")
@@ -363,6 +586,31 @@ async def convert_directory_files_into_docling_document(
         ) from e
 
 
+def _iter_new_html_files(folder: Path) -> Iterator[str]:
+    """Yield the HTML files of a folder that have no Markdown counterpart yet.
+
+    The folder is read once and files are yielded while it is being scanned. An HTML
+    file whose Markdown file has not been listed yet is checked on disk. Suffixes
+    are matched case-insensitively, while the Markdown counterpart is compared with
+    the case sensitivity of the platform, as the check on disk is.
+    """
+    md_names: set[str] = set()
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            name = entry.name.lower()
+            if name.endswith(".md"):
+                md_names.add(os.path.normcase(entry.name))
+            elif name.endswith(".html"):
+                md_name = f"{entry.name[: -len('.html')]}.md"
+                if (
+                    os.path.normcase(md_name) not in md_names
+                    and not (folder / md_name).is_file()
+                ):
+                    yield entry.path
+
+
 @mcp.tool(title="Convert HTML files in a folder to Markdown")
 async def convert_html_to_markdown(
     folder_path: Annotated[
@@ -381,23 +629,14 @@ async def convert_html_to_markdown(
                 )
             )
 
-        html_files = list(p.glob("*.html"))
-        md_files = {f.stem for f in p.glob("*.md")}
-
-        files_to_convert = [
-            str(html_file)
-            for html_file in html_files
-            if html_file.stem not in md_files
-        ]
-
-        if not files_to_convert:
-            await ctx.info("No new HTML files to convert.")
-            return ConvertToMarkdownOutput(output_files=[])
-
-        await ctx.info(f"Found {len(files_to_convert)} new HTML files to convert.")
-        return await convert_to_markdown(
-            sources=files_to_convert, ctx=ctx, output_folder=folder_path
+        result = await _convert_sources_to_markdown(
+            _iter_new_html_files(p), ctx, folder_path
         )
+        if not result.output_files:
+            await ctx.info("No new HTML files to convert.")
+        else:
+            await ctx.info(f"Converted {len(result.output_files)} new HTML files.")
+        return result
 
     except Exception as e:
         logger.exception(f"Error converting new HTML files in folder: {folder_path}")
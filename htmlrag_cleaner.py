@@ -8,15 +8,112 @@ Extracted and adapted for standalone use.
 """
 
 import re
-from bs4 import BeautifulSoup, Comment
+from bs4 import BeautifulSoup, CData, Comment, NavigableString, Tag
+
+# Prefer the C-based lxml parser, fall back to the pure-Python one if missing
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Used by concat_text to drop whitespace characters
+_WHITESPACE_DELETE = str.maketrans("", "", " \t\n\r\f\v")
+_DECLARATION_RE = re.compile(r"<\?xml.*?>|<!DOCTYPE.*?>", re.IGNORECASE | re.DOTALL)
+_BLANK_LINES_RE = re.compile(r"^\s*\n|\n\s*\Z", re.MULTILINE)
 
 
 def concat_text(text):
     """Helper function to normalize text by removing whitespace."""
-    text = "".join(text.split("\n"))
-    text = "".join(text.split("\t"))
-    text = "".join(text.split(" "))
-    return text
+    return text.translate(_WHITESPACE_DELETE)
+
+
+def text_types(tag):
+    """
+    Return the string types that count as text of tag, as in get_text().
+    
+    Most tags count NavigableString and CData, while tags such as <rt> or <rp>
+    only count their own string type (e.g. RubyTextString).
+    
+    Args:
+        tag: BeautifulSoup tag
+    
+    Returns:
+        Tuple of NavigableString subclasses
+    """
+    types = tag.interesting_string_types
+    if types is None:
+        return (NavigableString, CData)
+    return (types,) if isinstance(types, type) else tuple(types)
+
+
+def normalized_texts(soup):
+    """
+    Map every tag in soup to its text with whitespace removed.
+    
+    Tags are visited bottom-up so each tag reuses the already normalized text
+    of its children instead of re-walking its subtree with get_text(). As in
+    get_text(), only strings of the tag's text_types are counted.
+    
+    Args:
+        soup: BeautifulSoup object
+    
+    Returns:
+        Dictionary keyed by id(tag) holding the normalized text of each tag
+    """
+    norm = {}
+    for tag in reversed(soup.find_all(True)):
+        types = text_types(tag)
+        parts = []
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                if child.interesting_string_types == tag.interesting_string_types:
+                    parts.append(norm[id(child)])
+                else:
+                    # The child counts other strings (e.g. ruby text), use ours
+                    parts.append(concat_text(child.get_text(types=types)))
+            elif type(child) in types:
+                parts.append(concat_text(child))
+        norm[id(tag)] = "".join(parts)
+    return norm
+
+
+def strip_empty_tags(tag, preserve=()):
+    """
+    Remove descendants of tag that contain no text, in a single post-order pass.
+    
+    Children are processed before their parent, so a tag emptied by the removal
+    of its children is caught on its own visit without rescanning the tree.
+    
+    Args:
+        tag: BeautifulSoup tag whose descendants are cleaned
+        preserve: Tag names to keep even if they contain no text
+    
+    Returns:
+        True if tag still contains non-whitespace text
+    """
+    found = _strip_empty_tags(tag, preserve)
+    return any(t in found for t in text_types(tag))
+
+
+def _strip_empty_tags(tag, preserve):
+    """Strip empty descendants and return the string types of the text left.
+    
+    As in get_text(), a tag is empty when none of the remaining non-whitespace
+    strings below it is of one of its text_types.
+    """
+    found = set()
+    for child in list(tag.children):
+        if isinstance(child, Tag):
+            child_found = _strip_empty_tags(child, preserve)
+            if (child.name not in preserve
+                    and not any(t in child_found for t in text_types(child))):
+                child.decompose()
+                continue
+            found |= child_found
+        elif isinstance(child, NavigableString) and child.strip():
+            found.add(type(child))
+    return found
 
 
 def simplify_html(soup, keep_attr=False):
@@ -41,14 +138,7 @@ def simplify_html(soup, keep_attr=False):
             tag.attrs = {}
     
     # Remove empty tags recursively
-    while True:
-        removed = False
-        for tag in soup.find_all():
-            if not tag.text.strip():
-                tag.decompose()
-                removed = True
-        if not removed:
-            break
+    strip_empty_tags(soup)
     
     # Remove href attributes
     for tag in soup.find_all("a"):
@@ -61,30 +151,27 @@ def simplify_html(soup, keep_attr=False):
         comment.extract()
 
     # Remove redundant wrapper tags (tags with single child that has same text)
+    norm = normalized_texts(soup)
     for tag in soup.find_all():
         children = [child for child in tag.contents if not isinstance(child, str)]
         if len(children) == 1:
-            tag_text = tag.get_text()
-            child_text = ''.join([child.get_text() for child in tag.contents if not isinstance(child, str)])
-            if concat_text(child_text) == concat_text(tag_text):
+            if norm[id(children[0])] == norm[id(tag)]:
                 tag.replace_with_children()
     
     # Convert to string and remove empty lines
-    res = str(soup)
-    lines = [line for line in res.split("\n") if line.strip()]
-    res = "\n".join(lines)
+    res = _BLANK_LINES_RE.sub("", str(soup))
+    # The pattern needs a newline, a whitespace-only result is a single blank line
+    if res.isspace():
+        res = ""
     return res
 
 
 def clean_xml(html):
     """Remove XML declarations and DOCTYPE declarations."""
-    html = re.sub(r"<\?xml.*?>", "", html)
-    html = re.sub(r"<!DOCTYPE.*?>", "", html, flags=re.IGNORECASE)
-    html = re.sub(r"<!doctype.*?>", "", html, flags=re.IGNORECASE)
-    return html
+    return _DECLARATION_RE.sub("", html)
 
 
-def clean_html(html_content, keep_attr=False):
+def clean_html(html_content: str, keep_attr: bool = False) -> str:
     """
     Main cleaning function that combines all cleaning steps.
     
@@ -95,7 +182,7 @@ def clean_html(html_content, keep_attr=False):
     Returns:
         Cleaned HTML string
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     html = simplify_html(soup, keep_attr=keep_attr)
     html = clean_xml(html)
     return html
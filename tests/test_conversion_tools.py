@@ -1,13 +1,28 @@
 """Test the Docling MCP server conversion tools."""
 
+import asyncio
+import gc
+import os
 import shutil
-from collections.abc import AsyncGenerator
+import time
+from collections.abc import AsyncGenerator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any
 
 import pytest
+from mcp.shared.exceptions import McpError
 from mcp.types import TextContent
 
+from docling.datamodel.base_models import ConversionStatus
+from docling_core.types.doc.document import DoclingDocument
+
+from docling_mcp.docling_cache import get_cache_key
+from docling_mcp.settings.conversion import settings
+from docling_mcp.tools import conversion
+
 
 @pytest.mark.asyncio
 async def test_convert_directory_files_into_docling_document(
@@ -45,3 +60,258 @@ async def test_convert_directory_files_into_docling_document(
         assert "from_cache" in item
         assert not item.get("from_cache")
         assert item.get("document_key", None)
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.progress: list[tuple[float, float | None]] = []
+
+    async def info(self, message: str) -> None:
+        self.messages.append(message)
+        # let conversions finish while sources are still being submitted
+        await asyncio.sleep(0.01)
+
+    async def debug(self, message: str) -> None:
+        self.messages.append(message)
+
+    async def report_progress(
+        self, progress: float, total: float | None = None
+    ) -> None:
+        self.progress.append((progress, total))
+
+
+@pytest.fixture
+def thread_pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[ThreadPoolExecutor]:
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        monkeypatch.setattr(conversion, "_get_process_pool", lambda: pool)
+        yield pool
+
+
+@pytest.mark.parametrize("md_first", [True, False])
+def test_iter_new_html_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, md_first: bool
+) -> None:
+    for name in ("a.html", "a.md", "b.html", "C.HTML", "notes.txt"):
+        (tmp_path / name).touch()
+    (tmp_path / "d.html").mkdir()
+
+    scandir = os.scandir
+
+    @contextmanager
+    def ordered_scandir(path: Path) -> Iterator[Iterator[os.DirEntry[str]]]:
+        # list the Markdown file before or after its HTML file
+        with scandir(path) as entries:
+            yield iter(
+                sorted(entries, key=lambda e: e.name.endswith(".md") != md_first)
+            )
+
+    monkeypatch.setattr(os, "scandir", ordered_scandir)
+
+    files = sorted(Path(f).name for f in conversion._iter_new_html_files(tmp_path))
+    assert files == ["C.HTML", "b.html"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lazy", [True, False])
+async def test_convert_sources_to_markdown_keeps_order(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    thread_pool: ThreadPoolExecutor,
+    lazy: bool,
+) -> None:
+    delays = {"a": 0.0, "b": 0.2, "c": 0.1}
+
+    def convert_one(source: str, output_file: Path, num_threads: int) -> str:
+        # c finishes before b
+        time.sleep(delays[Path(source).stem])
+        output_file.write_text(source)
+        return str(output_file)
+
+    monkeypatch.setattr(conversion, "_convert_one", convert_one)
+
+    ctx = FakeContext()
+    sources = [f"/data/{stem}.html" for stem in delays]
+    res = await conversion._convert_sources_to_markdown(
+        iter(sources) if lazy else sources,
+        ctx,  # type: ignore[arg-type]
+        str(tmp_path / "out"),
+    )
+
+    assert res.output_files == [str(tmp_path / "out" / f"{s}.md") for s in delays]
+    assert sorted(p for p, _ in ctx.progress) == [1, 2, 3]
+    if not lazy:
+        # the total of a list is known before the first source is submitted
+        assert {t for _, t in ctx.progress} == {3}
+
+
+@pytest.mark.asyncio
+async def test_convert_sources_to_markdown_errors(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    thread_pool: ThreadPoolExecutor,
+) -> None:
+    def convert_one(source: str, output_file: Path, num_threads: int) -> str:
+        if "bad" in source:
+            raise RuntimeError("broken document")
+        return str(output_file)
+
+    monkeypatch.setattr(conversion, "_convert_one", convert_one)
+
+    with pytest.raises(McpError, match=r"bad\.html: broken document"):
+        await conversion._convert_sources_to_markdown(
+            ["/data/a.html", "/data/bad.html"],
+            FakeContext(),  # type: ignore[arg-type]
+            str(tmp_path),
+        )
+
+    with pytest.raises(McpError, match="would both be converted"):
+        await conversion._convert_sources_to_markdown(
+            ["/data/a.html", "/other/a.pdf"],
+            FakeContext(),  # type: ignore[arg-type]
+            str(tmp_path),
+        )
+
+
+class FakeConverter:
+    def __init__(
+        self,
+        status: ConversionStatus = ConversionStatus.SUCCESS,
+        errors: list[str] | None = None,
+    ) -> None:
+        self.status = status
+        self.errors = errors or []
+        self.sources: list[Path] = []
+
+    def convert_all(
+        self, sources: list[Path], raises_on_error: bool = True
+    ) -> Iterator[SimpleNamespace]:
+        self.sources = sources
+        # results do not come back in input order
+        for source in reversed(sources):
+            yield SimpleNamespace(
+                input=SimpleNamespace(file=source),
+                status=self.status,
+                errors=self.errors,
+                document=DoclingDocument(name=source.name),
+            )
+
+
+@pytest.mark.asyncio
+async def test_convert_directory_files_maps_results(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (tmp_path / name).touch()
+    document_cache: dict[str, DoclingDocument] = {}
+    monkeypatch.setattr(conversion, "local_document_cache", document_cache)
+    monkeypatch.setattr(conversion, "local_stack_cache", {})
+    cached_key = get_cache_key(str(tmp_path / "b.pdf"))
+    document_cache[cached_key] = DoclingDocument(name="b.pdf")
+    converter = FakeConverter()
+    monkeypatch.setattr(conversion, "_get_converter", lambda: converter)
+
+    ctx = FakeContext()
+    res = await conversion.convert_directory_files_into_docling_document(
+        str(tmp_path),
+        ctx,  # type: ignore[arg-type]
+    )
+
+    # only the files missing from the cache are converted
+    assert sorted(p.name for p in converter.sources) == ["a.pdf", "c.pdf"]
+    with os.scandir(tmp_path) as entries:
+        paths = [e.path for e in entries]
+    assert [o.document_key for o in res] == [get_cache_key(p) for p in paths]
+    for path, output in zip(paths, res, strict=True):
+        assert output.from_cache == (output.document_key == cached_key)
+        assert document_cache[output.document_key].name == Path(path).name
+    assert ctx.progress == [(1, 2), (2, 2)]
+
+
+@pytest.mark.asyncio
+async def test_convert_directory_files_conversion_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a.pdf").touch()
+    document_cache: dict[str, DoclingDocument] = {}
+    monkeypatch.setattr(conversion, "local_document_cache", document_cache)
+    monkeypatch.setattr(conversion, "local_stack_cache", {})
+    converter = FakeConverter(ConversionStatus.FAILURE)
+    monkeypatch.setattr(conversion, "_get_converter", lambda: converter)
+
+    with pytest.raises(McpError, match=r"Conversion failed for .*a\.pdf"):
+        await conversion.convert_directory_files_into_docling_document(
+            str(tmp_path),
+            FakeContext(),  # type: ignore[arg-type]
+        )
+    assert not document_cache
+
+
+@pytest.mark.asyncio
+async def test_convert_directory_files_partial_success(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    (tmp_path / "a.pdf").touch()
+    document_cache: dict[str, DoclingDocument] = {}
+    monkeypatch.setattr(conversion, "local_document_cache", document_cache)
+    monkeypatch.setattr(conversion, "local_stack_cache", {})
+    converter = FakeConverter(ConversionStatus.PARTIAL_SUCCESS, ["page 2 failed"])
+    monkeypatch.setattr(conversion, "_get_converter", lambda: converter)
+
+    res = await conversion.convert_directory_files_into_docling_document(
+        str(tmp_path),
+        FakeContext(),  # type: ignore[arg-type]
+    )
+
+    assert res[0].document_key in document_cache
+    assert "page 2 failed" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("rss_mb", "full"), [(None, True), (100.0, False), (700.0, True)]
+)
+def test_cleanup_memory_threshold(
+    monkeypatch: pytest.MonkeyPatch, rss_mb: float | None, full: bool
+) -> None:
+    generations: list[int | None] = []
+
+    def collect(generation: int | None = None) -> int:
+        generations.append(generation)
+        return 0
+
+    monkeypatch.setattr(gc, "collect", collect)
+    monkeypatch.setattr(conversion, "_get_rss_mb", lambda: rss_mb)
+    monkeypatch.setattr(settings, "gc_threshold_mb", 512)
+    monkeypatch.setattr(conversion, "_last_full_gc_rss_mb", 50.0)
+
+    conversion.cleanup_memory()
+
+    expected: list[int | None] = [None] if full else [0]
+    assert generations == expected
+    assert conversion._last_full_gc_rss_mb == ((rss_mb or 0.0) if full else 50.0)
+
+
+@pytest.mark.parametrize(
+    ("num_sources", "max_workers", "num_threads", "expected"),
+    [
+        (1, None, 30, 8),
+        (1, None, 4, 4),
+        (2, None, 30, 4),
+        (20, None, 30, 1),
+        (None, None, 30, 1),
+        (None, 2, 30, 4),
+        (3, 2, 30, 4),
+    ],
+)
+def test_get_worker_num_threads(
+    monkeypatch: pytest.MonkeyPatch,
+    num_sources: int | None,
+    max_workers: int | None,
+    num_threads: int,
+    expected: int,
+) -> None:
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(settings, "max_workers", max_workers)
+    monkeypatch.setattr(settings, "num_threads", num_threads)
+
+    assert conversion._get_worker_num_threads(num_sources) == expected
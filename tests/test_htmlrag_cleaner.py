@@ -0,0 +1,19 @@
+"""Test the HtmlRAG cleaner."""
+
+import pytest
+
+import htmlrag_cleaner
+from htmlrag_cleaner import clean_html
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_clean_html_keeps_ruby_text(
+    monkeypatch: pytest.MonkeyPatch, parser: str
+) -> None:
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    monkeypatch.setattr(htmlrag_cleaner, "HTML_PARSER", parser)
+
+    html = clean_html("<p>漢<ruby>漢<rt>kan</rt></ruby></p>")
+
+    assert html == "<p>漢<ruby>漢<rt>kan</rt></ruby></p>"
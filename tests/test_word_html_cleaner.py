@@ -0,0 +1,57 @@
+"""Test the Word HTML cleaner."""
+
+import pytest
+
+import word_html_cleaner
+from word_html_cleaner import (
+    analyze_cleaning,
+    clean_word_html,
+    clean_word_html_batch,
+    clean_word_html_with_stats,
+)
+
+DOCUMENTS = [
+    (
+        "<html><head><style>p {}</style></head><body>"
+        "<table><tr><td><table><tr><th>Year</th><th>Total</th></tr>"
+        "<tr><td>2023</td><td>12.5</td></tr><tr><td>2024</td><td>13.1</td></tr>"
+        "</table></td></tr></table></body></html>"
+    ),
+    '<body><div class="x"><p><span>Text</span></p><p> </p></div></body>',
+    "<body> <p></p></body>",
+    "",
+]
+
+
+@pytest.mark.parametrize("keep_attr", [True, False])
+def test_clean_word_html_batch_matches_serial(keep_attr: bool) -> None:
+    expected = [clean_word_html(doc, keep_attr=keep_attr) for doc in DOCUMENTS]
+
+    res = clean_word_html_batch(DOCUMENTS, keep_attr=keep_attr, max_workers=2)
+
+    assert res == expected
+    assert res[0][1] == 1
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_clean_word_html_keeps_ruby_text(
+    monkeypatch: pytest.MonkeyPatch, parser: str
+) -> None:
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    monkeypatch.setattr(word_html_cleaner, "HTML_PARSER", parser)
+
+    html, _ = clean_word_html("<p>漢<ruby>漢<rt>kan</rt></ruby></p>")
+
+    assert html == "<p>漢<ruby>漢<rt>kan</rt></ruby></p>"
+
+
+@pytest.mark.parametrize("keep_attr", [True, False])
+def test_analyze_cleaning_stats_match_reparse(keep_attr: bool) -> None:
+    # analyze_cleaning needs a non-empty original
+    for doc in filter(None, DOCUMENTS):
+        html, removed, stats = clean_word_html_with_stats(doc, keep_attr=keep_attr)
+
+        assert (html, removed) == clean_word_html(doc, keep_attr=keep_attr)
+        assert stats["wrapper_tables_removed"] == removed
+        assert analyze_cleaning(doc, html, stats) == analyze_cleaning(doc, html)
@@ -8,7 +8,7 @@ Paper: "HtmlRAG: HTML is Better Than Plain Text for Modeling Retrieval Results i
 
 Core concepts from HtmlRAG:
 - In-place DOM operations (preserves document order)
-- Iterative empty tag removal
+- Empty tag removal (single bottom-up pass)
 - Basic cleaning (scripts, styles, comments)
 
 Our enhancements for Word HTML:
@@ -21,19 +21,204 @@ MIT License
 """
 
 import re
-from bs4 import BeautifulSoup, Comment
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from bs4 import BeautifulSoup, CData, Comment, NavigableString, Tag
 from typing import Optional
 
+# Prefer the C-based lxml parser, fall back to the pure-Python one if missing
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Translation table deleting all ASCII whitespace in a single pass
+_WHITESPACE_DELETE = str.maketrans("", "", " \t\n\r\f\v")
+_DECLARATION_RE = re.compile(r"<\?xml.*?>|<!DOCTYPE.*?>", re.IGNORECASE | re.DOTALL)
+_BLANK_LINES_RE = re.compile(r"^\s*\n|\n\s*\Z", re.MULTILINE)
+_NUMBER_RE = re.compile(r'\d+[.,]\d+|\d{3,}')
+# Times (hh:mm:ss) are already matched by the date alternative
+_DATE_TIME_RE = re.compile(r'\d{1,2}[:/]\d{1,2}[:/]\d{2,4}|AM|PM')
+TABLE_STRUCTURE_TAGS = frozenset({'table', 'tbody', 'thead', 'tr', 'td', 'th'})
+SEMANTIC_ATTRS = ('colspan', 'rowspan')
+
 
 def concat_text(text: str) -> str:
     """Helper function to normalize text by removing whitespace (from HtmlRAG)"""
-    text = "".join(text.split("\n"))
-    text = "".join(text.split("\t"))
-    text = "".join(text.split(" "))
-    return text
+    return text.translate(_WHITESPACE_DELETE)
+
+
+def text_types(tag) -> tuple:
+    """
+    Return the string types that count as text of tag, as in get_text().
+    
+    Most tags count NavigableString and CData, while tags such as <rt> or <rp>
+    only count their own string type (e.g. RubyTextString).
+    
+    Args:
+        tag: BeautifulSoup tag
+    
+    Returns:
+        Tuple of NavigableString subclasses
+    """
+    types = tag.interesting_string_types
+    if types is None:
+        return (NavigableString, CData)
+    return (types,) if isinstance(types, type) else tuple(types)
+
+
+def normalized_texts(soup) -> dict:
+    """
+    Map every tag in soup to its text with whitespace removed.
+    
+    Tags are visited bottom-up so each tag reuses the already normalized text
+    of its children instead of re-walking its subtree with get_text(). As in
+    get_text(), only strings of the tag's text_types are counted.
+    
+    Args:
+        soup: BeautifulSoup object
+    
+    Returns:
+        Dictionary keyed by id(tag) holding the normalized text of each tag
+    """
+    norm = {}
+    for tag in reversed(soup.find_all(True)):
+        types = text_types(tag)
+        parts = []
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                if child.interesting_string_types == tag.interesting_string_types:
+                    parts.append(norm[id(child)])
+                else:
+                    # The child counts other strings (e.g. ruby text), use ours
+                    parts.append(concat_text(child.get_text(types=types)))
+            elif type(child) in types:
+                parts.append(concat_text(child))
+        norm[id(tag)] = "".join(parts)
+    return norm
 
 
-def is_wrapper_table(table) -> bool:
+def prune_attributes(tag, keep_attr: bool = True) -> None:
+    """
+    Remove href links and, unless keep_attr, all non-semantic attributes.
+    
+    Args:
+        tag: BeautifulSoup tag to clean in place
+        keep_attr: Whether to preserve attributes other than href
+    """
+    if not keep_attr:
+        # Keep semantic attributes even if keep_attr=False
+        tag.attrs = {name: tag.attrs[name] for name in SEMANTIC_ATTRS if name in tag.attrs}
+    elif tag.name == 'a' and 'href' in tag.attrs:
+        # Remove href attributes (from HtmlRAG - security/privacy)
+        del tag['href']
+
+
+def strip_empty_tags(tag, preserve=(), keep_attr: bool = True) -> bool:
+    """
+    Remove descendants without text in a single bottom-up (post-order) pass.
+    
+    Children are visited before their parent, so a parent emptied by the
+    removal of its children is caught on its own visit. This replaces the
+    iterative HtmlRAG loop that rescanned the whole tree until nothing changed.
+    Attributes of the remaining tags are pruned in the same pass.
+    
+    Args:
+        tag: BeautifulSoup element whose descendants are cleaned
+        preserve: Tag names kept even when empty (e.g. table structure)
+        keep_attr: Whether to preserve attributes other than href
+        
+    Returns:
+        True if tag still contains non-whitespace text
+    """
+    found = _strip_empty_tags(tag, preserve, keep_attr)
+    return any(t in found for t in text_types(tag))
+
+
+def _strip_empty_tags(tag, preserve, keep_attr: bool) -> set:
+    """Strip empty descendants and return the string types of the text left.
+    
+    As in get_text(), a tag is empty when none of the remaining non-whitespace
+    strings below it is of one of its text_types.
+    """
+    found = set()
+    for child in list(tag.children):
+        if isinstance(child, Tag):
+            child_found = _strip_empty_tags(child, preserve, keep_attr)
+            if (child.name not in preserve
+                    and not any(t in child_found for t in text_types(child))):
+                child.decompose()
+                continue
+            found |= child_found
+            prune_attributes(child, keep_attr)
+        elif isinstance(child, NavigableString) and child.strip():
+            found.add(type(child))
+    return found
+
+
+@dataclass
+class TableStats:
+    """Structure of a table collected in a single walk over its descendants."""
+    
+    cells_per_row: list = field(default_factory=list)
+    direct_cells: int = 0
+    direct_cells_with_table: int = 0
+    has_th: bool = False
+
+
+def get_table_stats(table) -> TableStats:
+    """
+    Collect rows, cells and header information of a table in one traversal.
+    
+    Rows are the <tr> children of the table, or of the first <tbody> found
+    below it when there is one (same lookup as table.find('tbody')).
+    
+    Args:
+        table: BeautifulSoup table element
+        
+    Returns:
+        TableStats with the cell count of every row
+    """
+    stats = TableStats()
+    tbody = None
+    table_rows = {}
+    tbody_rows = {}
+    
+    for element in table.descendants:
+        if not isinstance(element, Tag):
+            continue
+        name = element.name
+        parent = element.parent
+        if name == 'tbody':
+            if tbody is None:
+                tbody = element
+        elif name == 'tr':
+            if parent is table:
+                table_rows[id(element)] = 0
+            elif parent is tbody:
+                tbody_rows[id(element)] = 0
+        elif name in ('td', 'th'):
+            if name == 'th':
+                stats.has_th = True
+            if id(parent) in table_rows:
+                table_rows[id(parent)] += 1
+            elif id(parent) in tbody_rows:
+                tbody_rows[id(parent)] += 1
+            elif parent is table:
+                # Cells directly below the table (no row); rare in practice
+                stats.direct_cells += 1
+                if element.find('table') is not None:
+                    stats.direct_cells_with_table += 1
+    
+    rows = tbody_rows if tbody is not None else table_rows
+    stats.cells_per_row = list(rows.values())
+    return stats
+
+
+def is_wrapper_table(table, stats: Optional[TableStats] = None) -> bool:
     """
     Detect if a table is a layout wrapper vs actual data table.
     
@@ -43,46 +228,38 @@ def is_wrapper_table(table) -> bool:
     
     Args:
         table: BeautifulSoup table element
+        stats: Precomputed table statistics (computed if not given)
         
     Returns:
         True if table is a wrapper (should be removed), False if data table (keep)
     """
-    # Get rows
-    rows = table.find_all('tr', recursive=False)
-    tbody = table.find('tbody')
-    if tbody:
-        rows = tbody.find_all('tr', recursive=False)
+    if stats is None:
+        stats = get_table_stats(table)
+    rows = stats.cells_per_row
     
     # Heuristic 1: No rows = wrapper
     if len(rows) == 0:
         return True
     
     # Heuristic 2: Single row with single cell (classic Word layout wrapper)
-    if len(rows) == 1:
-        cells = rows[0].find_all(['td', 'th'], recursive=False)
-        if len(cells) <= 1:
-            return True
+    if len(rows) == 1 and rows[0] <= 1:
+        return True
     
     # Heuristic 3: Check if every cell contains a nested table (pure layout)
-    cells = table.find_all(['td', 'th'], recursive=False)
-    if len(cells) > 0:
-        nested_tables = [cell.find('table') for cell in cells]
-        if all(nested_tables):
-            # Every cell has a table = this is a layout container
-            return True
+    if stats.direct_cells > 0 and stats.direct_cells_with_table == stats.direct_cells:
+        # Every cell has a table = this is a layout container
+        return True
     
     # Heuristic 4: Very few cells without data patterns
-    total_cells = sum(len(row.find_all(['td', 'th'], recursive=False)) 
-                     for row in rows)
-    if total_cells < 4:
-        if not contains_tabular_data_pattern(table):
+    if sum(rows) < 4:
+        if not contains_tabular_data_pattern(table, stats):
             return True
     
     # Default: Keep the table (data table)
     return False
 
 
-def contains_tabular_data_pattern(table) -> bool:
+def contains_tabular_data_pattern(table, stats: Optional[TableStats] = None) -> bool:
     """
     Detect if table contains actual data vs just layout.
     
@@ -94,6 +271,7 @@ def contains_tabular_data_pattern(table) -> bool:
     
     Args:
         table: BeautifulSoup table element
+        stats: Precomputed table statistics (computed if not given)
         
     Returns:
         True if table contains data patterns
@@ -101,47 +279,56 @@ def contains_tabular_data_pattern(table) -> bool:
     text = table.get_text()
     
     # Pattern 1: Multiple numbers (financial data, IDs, quantities)
-    numbers = re.findall(r'\d+[.,]\d+|\d{3,}', text)
-    if len(numbers) > 5:
+    # Stop scanning as soon as a sixth number is found
+    if next(islice(_NUMBER_RE.finditer(text), 5, None), None) is not None:
         return True
     
     # Pattern 2: Date/time patterns
-    if re.search(r'\d{1,2}[:/]\d{1,2}[:/]\d{2,4}', text) or \
-       re.search(r'\d{1,2}:\d{2}:\d{2}', text) or \
-       re.search(r'(AM|PM)', text):
+    if _DATE_TIME_RE.search(text):
         return True
     
+    if stats is None:
+        stats = get_table_stats(table)
+    
     # Pattern 3: Consistent row structure (repeating data)
-    rows = table.find_all('tr', recursive=False)
-    tbody = table.find('tbody')
-    if tbody:
-        rows = tbody.find_all('tr', recursive=False)
-    
-    if len(rows) >= 3:
-        cell_counts = [len(row.find_all(['td', 'th'], recursive=False)) 
-                       for row in rows]
+    cell_counts = stats.cells_per_row
+    if len(cell_counts) >= 3:
         # Consistent cell counts = structured data
         if len(set(cell_counts)) <= 2 and max(cell_counts) >= 2:
             return True
     
     # Pattern 4: Headers (th tags or semantic indicators)
-    if table.find('th'):
+    if stats.has_th:
         return True
     
     return False
 
 
+def get_tag_depths(soup) -> dict:
+    """
+    Calculate the nesting depth (number of parent elements) of every tag.
+    
+    Tags are visited top-down, so each depth is derived from the already
+    known depth of its parent instead of walking up to the root per tag.
+    
+    Args:
+        soup: BeautifulSoup object
+        
+    Returns:
+        Dictionary keyed by id(tag) holding the depth of each tag
+    """
+    depths = {}
+    for tag in soup.find_all(True):
+        depths[id(tag)] = depths.get(id(tag.parent), 0) + 1
+    return depths
+
+
 def get_table_depth(table) -> int:
     """Calculate nesting depth of a table (how many parent elements)"""
-    depth = 0
-    parent = table.parent
-    while parent:
-        depth += 1
-        parent = parent.parent
-    return depth
+    return sum(1 for _ in table.parents)
 
 
-def clean_word_html(html_content: str, keep_attr: bool = True) -> str:
+def clean_word_html(html_content: str, keep_attr: bool = True) -> tuple[str, int]:
     """
     Clean Word-exported HTML while preserving semantic structure.
     
@@ -157,13 +344,42 @@ def clean_word_html(html_content: str, keep_attr: bool = True) -> str:
         keep_attr: Whether to preserve HTML attributes (default: True for semantics)
         
     Returns:
-        Cleaned HTML string with:
+        Tuple of (cleaned_html, wrapper_tables_removed), the cleaned HTML with:
         - Preserved document order (in-place operations)
         - Removed layout tables
         - Preserved data tables
         - Reduced file size
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    html, wrapper_tables_removed, _ = _clean_word_html(html_content, keep_attr)
+    return html, wrapper_tables_removed
+
+
+def clean_word_html_with_stats(html_content: str,
+                               keep_attr: bool = True) -> tuple[str, int, dict]:
+    """
+    Clean Word-exported HTML like clean_word_html and collect table statistics.
+    
+    The statistics are read from the tree the cleaning already holds, so
+    analyze_cleaning does not need to parse the HTML again.
+    
+    Args:
+        html_content: Raw HTML string
+        keep_attr: Whether to preserve HTML attributes (default: True for semantics)
+        
+    Returns:
+        Tuple of (cleaned_html, wrapper_tables_removed, stats) where stats can
+        be passed to analyze_cleaning
+    """
+    html, wrapper_tables_removed, stats = _clean_word_html(
+        html_content, keep_attr, collect_stats=True)
+    assert stats is not None
+    return html, wrapper_tables_removed, stats
+
+
+def _clean_word_html(html_content: str, keep_attr: bool,
+                     collect_stats: bool = False) -> tuple[str, int, Optional[dict]]:
+    """Clean Word-exported HTML, see clean_word_html for the steps."""
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     
     # Step 1: Remove scripts and styles (from HtmlRAG)
     for script in soup(['script', 'style', 'meta', 'link']):
@@ -176,12 +392,12 @@ def clean_word_html(html_content: str, keep_attr: bool = True) -> str:
     
     # Step 3: Smart table unwrapping (our enhancement)
     # Process from deepest to shallowest to avoid conflicts
+    depths = get_tag_depths(soup)
     tables = soup.find_all('table')
-    tables_with_depth = [(table, get_table_depth(table)) for table in tables]
-    tables_with_depth.sort(key=lambda x: x[1], reverse=True)
+    tables.sort(key=lambda table: depths[id(table)], reverse=True)
     
     wrapper_tables_removed = 0
-    for table, depth in tables_with_depth:
+    for table in tables:
         if is_wrapper_table(table):
             # This is a layout wrapper - unwrap it AND its tbody/thead
             # First unwrap any tbody/thead inside this table
@@ -191,95 +407,132 @@ def clean_word_html(html_content: str, keep_attr: bool = True) -> str:
             table.unwrap()
             wrapper_tables_removed += 1
     
-    # Step 4: Remove href attributes (from HtmlRAG - security/privacy)
-    for tag in soup.find_all("a"):
-        if "href" in tag.attrs:
-            del tag["href"]
-    
-    # Step 5: Clean attributes if requested
-    if not keep_attr:
-        for tag in soup.find_all(True):
-            # Keep semantic attributes even if keep_attr=False
-            attrs_to_keep = {}
-            if 'colspan' in tag.attrs:
-                attrs_to_keep['colspan'] = tag.attrs['colspan']
-            if 'rowspan' in tag.attrs:
-                attrs_to_keep['rowspan'] = tag.attrs['rowspan']
-            
-            tag.attrs = attrs_to_keep
-    
-    # Step 6: Remove redundant single-child wrappers (from HtmlRAG, modified)
+    # Step 4: Remove redundant single-child wrappers (from HtmlRAG, modified)
+    # Unwrapping never changes a tag's text, so it is normalized once upfront
+    norm = normalized_texts(soup)
     for tag in soup.find_all():
         # Skip table structure
-        if tag.name in ['table', 'tbody', 'thead', 'tr', 'td', 'th']:
+        if tag.name in TABLE_STRUCTURE_TAGS:
             continue
             
         children = [child for child in tag.contents if not isinstance(child, str)]
         if len(children) == 1:
-            tag_text = tag.get_text()
-            child_text = ''.join([child.get_text() for child in tag.contents 
-                                  if not isinstance(child, str)])
-            if concat_text(child_text) == concat_text(tag_text):
+            if norm[id(children[0])] == norm[id(tag)]:
                 tag.replace_with_children()
     
-    # Step 7: Remove empty tags EXCEPT table structure (modified from HtmlRAG)
-    while True:
-        removed = False
-        for tag in soup.find_all():
-            # PRESERVE table structure tags even if empty
-            if tag.name in ['table', 'tbody', 'thead', 'tr', 'td', 'th']:
-                continue
-            
-            # Remove other empty tags
-            if not tag.text.strip():
-                tag.decompose()
-                removed = True
-        if not removed:
-            break
-    
-    # Step 8: Clean XML declarations (from HtmlRAG)
-    html = str(soup)
-    html = re.sub(r"<\?xml.*?>", "", html)
-    html = re.sub(r"<!DOCTYPE.*?>", "", html, flags=re.IGNORECASE)
-    html = re.sub(r"<!doctype.*?>", "", html, flags=re.IGNORECASE)
-    
-    # Step 9: Remove empty lines (from HtmlRAG)
-    lines = [line for line in html.split("\n") if line.strip()]
-    html = "\n".join(lines)
+    # Step 5: Remove empty tags EXCEPT table structure (modified from HtmlRAG)
+    # PRESERVE table structure tags even if empty. The same pass removes href
+    # attributes and, unless keep_attr, all non-semantic attributes.
+    strip_empty_tags(soup, preserve=TABLE_STRUCTURE_TAGS, keep_attr=keep_attr)
     
-    return html, wrapper_tables_removed
+    # Collect table statistics from the cleaned tree instead of reparsing it later
+    stats = None
+    if collect_stats:
+        cleaned_tables, max_nesting_depth = count_tables(soup)
+        stats = {
+            'original_tables': len(tables),
+            'cleaned_tables': cleaned_tables,
+            'wrapper_tables_removed': wrapper_tables_removed,
+            'max_nesting_depth': max_nesting_depth,
+        }
+    
+    # Step 6: Clean XML declarations (from HtmlRAG)
+    html = _DECLARATION_RE.sub("", str(soup))
+    
+    # Step 7: Remove empty lines (from HtmlRAG)
+    html = _BLANK_LINES_RE.sub("", html)
+    # The pattern needs a newline, a whitespace-only result is a single blank line
+    if html.isspace():
+        html = ""
+    
+    return html, wrapper_tables_removed, stats
 
 
-def analyze_cleaning(original_html: str, cleaned_html: str) -> dict:
+def clean_word_html_batch(html_contents, keep_attr: bool = True,
+                          max_workers: Optional[int] = None) -> list:
+    """
+    Clean several Word HTML documents in parallel worker processes.
+    
+    Documents are independent, so each one is sent as a string to a worker
+    process and cleaned there (BeautifulSoup work holds the GIL, so threads
+    would not help). Tables inside one document are still processed serially:
+    unwrapping an inner wrapper changes the rows and cells of the table around
+    it, so wrapper verdicts cannot be computed upfront.
+    
+    Args:
+        html_contents: Iterable of raw HTML strings
+        keep_attr: Whether to preserve HTML attributes (default: True for semantics)
+        max_workers: Number of worker processes (default: number of CPUs)
+        
+    Returns:
+        List of (cleaned_html, wrapper_tables_removed) tuples in input order
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(clean_word_html, keep_attr=keep_attr),
+                                 html_contents))
+
+
+def analyze_cleaning(original_html: str, cleaned_html: str,
+                     stats: Optional[dict] = None) -> dict:
     """
     Analyze the cleaning results.
     
+    Args:
+        original_html: Raw HTML string
+        cleaned_html: Cleaned HTML string
+        stats: Table statistics returned by clean_word_html_with_stats. If not
+            given, both HTML strings are parsed to count their tables.
+    
     Returns:
         Dictionary with statistics and validation results
     """
-    orig_soup = BeautifulSoup(original_html, 'html.parser')
-    clean_soup = BeautifulSoup(cleaned_html, 'html.parser')
-    
-    orig_tables = orig_soup.find_all('table')
-    clean_tables = clean_soup.find_all('table')
+    if stats is None:
+        original_tables, _ = count_tables(BeautifulSoup(original_html, HTML_PARSER))
+        cleaned_tables, max_nesting_depth = count_tables(
+            BeautifulSoup(cleaned_html, HTML_PARSER))
+    else:
+        original_tables = stats['original_tables']
+        cleaned_tables = stats['cleaned_tables']
+        max_nesting_depth = stats['max_nesting_depth']
     
     return {
         'original_size': len(original_html),
         'cleaned_size': len(cleaned_html),
         'reduction_percent': ((len(original_html) - len(cleaned_html)) / len(original_html)) * 100,
-        'original_tables': len(orig_tables),
-        'cleaned_tables': len(clean_tables),
-        'tables_removed': len(orig_tables) - len(clean_tables),
-        'max_nesting_depth': max([get_table_nesting_depth(t) for t in clean_tables]) if clean_tables else 0
+        'original_tables': original_tables,
+        'cleaned_tables': cleaned_tables,
+        'tables_removed': original_tables - cleaned_tables,
+        'max_nesting_depth': max_nesting_depth
     }
 
 
 def get_table_nesting_depth(table) -> int:
     """Count how many parent tables this table has"""
-    depth = 0
-    parent = table.parent
-    while parent:
+    return sum(1 for parent in table.parents if parent.name == 'table')
+
+
+def count_tables(soup) -> tuple:
+    """
+    Count tables and their maximum nesting depth in a single top-down pass.
+    
+    The nesting depth of a table is the number of parent tables it has.
+    
+    Args:
+        soup: BeautifulSoup object
+        
+    Returns:
+        Tuple of (number of tables, maximum nesting depth)
+    """
+    nesting = {}
+    table_count = 0
+    max_depth = 0
+    for tag in soup.find_all(True):
+        parent = tag.parent
+        depth = nesting.get(id(parent), 0)
         if parent.name == 'table':
             depth += 1
-        parent = parent.parent
-    return depth
+        nesting[id(tag)] = depth
+        if tag.name == 'table':
+            table_count += 1
+            max_depth = max(max_depth, depth)
+    return table_count, max_depth